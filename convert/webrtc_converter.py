@@ -9,25 +9,155 @@ Usage:
 """
 
 import os
+import re
 import sys
+import mmap
+import json
+import hashlib
+import functools
 import argparse
 import subprocess
+import collections
 import math
 import shutil
 import tempfile
 import urllib.request
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 class WebRTCConverter:
-    def __init__(self, input_file, bitrate_kbps, output_dir, segment_length=2, width=None, height=None):
+    # Hardware H.264 encoders in order of preference, keyed by --hwaccel name
+    HW_ENCODERS = {
+        'nvenc': 'h264_nvenc',
+        'amf': 'h264_amf',
+        'vaapi': 'h264_vaapi',
+        'qsv': 'h264_qsv',
+    }
+    VAAPI_DEVICE = '/dev/dri/renderD128'
+    DOWNLOAD_WORKERS = 8
+    
+    # Non-comment, non-blank playlist lines (segment URIs)
+    _SEGMENT_LINE_RE = re.compile(rb'(?m)^([^#\n][^\n]*?)\s*$')
+    
+    # Output of `ffmpeg -encoders`/`-filters`, probed once per process
+    _ffmpeg_components = {}
+    
+    _FFMPEG_ARGV_PREFIX = ('ffmpeg', '-y')
+    _FFMPEG_QUIET_ARGS = ('-nostdin', '-hide_banner', '-loglevel', 'warning')
+    
+    # Lowercased FFmpeg messages that mean hardware setup failed, worth a software retry
+    _HW_INIT_ERRORS = (
+        'cannot load',
+        'device creation failed',
+        'no device available',
+        'no capable devices',
+        'failed to initialise',
+        'failed to initialize',
+        'hwaccel initialisation returned error',
+        'failed setup for format',
+        'impossible to convert between the formats',
+        'error while opening encoder',
+        'error initializing output stream',
+        'openencodesessionex failed',
+        'function not implemented',
+    )
+    
+    # Static codec arguments per encoder
+    _X264_ARGV_TEMPLATE = (
+        '-c:v', 'libx264',
+        '-profile:v', 'baseline',      # Maximum compatibility
+        '-level', '3.1',               # Widely supported level
+        '-preset', 'fast',             # Good speed/quality balance
+        '-coder', '0',                 # CAVLC (not CABAC)
+        '-fast-pskip', '1',            # Fast skip decisions
+    )
+    _NVENC_ARGV_TEMPLATE = (
+        '-c:v', 'h264_nvenc',
+        '-profile:v', 'baseline',
+        '-level', '3.1',
+        '-preset', 'p4',               # Balanced NVENC preset
+        '-tune', 'll',                 # Low latency
+        '-rc', 'cbr',
+        '-rc-lookahead', '0',
+        '-zerolatency', '1',
+    )
+    _AMF_ARGV_TEMPLATE = (
+        '-c:v', 'h264_amf',
+        '-profile:v', 'constrained_baseline',
+        '-level', '3.1',
+        '-usage', 'lowlatency',
+        '-quality', 'speed',
+        '-rc', 'cbr',
+    )
+    _VAAPI_ARGV_TEMPLATE = (
+        '-c:v', 'h264_vaapi',
+        '-profile:v', 'constrained_baseline',
+        '-level', '3.1',
+        '-rc_mode', 'CBR',
+    )
+    _QSV_ARGV_TEMPLATE = (
+        '-c:v', 'h264_qsv',
+        '-profile:v', 'baseline',
+        '-level', '3.1',
+        '-preset', 'veryfast',
+        '-look_ahead', '0',
+    )
+    _ENCODER_ARGV_TEMPLATES = {
+        'h264_nvenc': _NVENC_ARGV_TEMPLATE,
+        'h264_amf': _AMF_ARGV_TEMPLATE,
+        'h264_vaapi': _VAAPI_ARGV_TEMPLATE,
+        'h264_qsv': _QSV_ARGV_TEMPLATE,
+    }
+    
+    # Encoder-independent output settings
+    _OUTPUT_ARGV_TEMPLATE = (
+        # WebRTC compatibility settings
+        '-bf', '0',                    # No B-frames
+        '-refs', '1',                  # Single reference frame
+        
+        # Let the encoder use all available cores
+        '-threads', '0',
+        
+        # Disable audio output
+        '-an',
+    )
+    
+    # HLS segmentation
+    _HLS_ARGV_TEMPLATE = (
+        '-f', 'hls',
+        '-hls_playlist_type', 'vod',
+    )
+    
+    PASSLOG_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'webrtc_converter')
+    PASSLOG_CACHE_BYTES = 4 * 1024 ** 3  # mb-tree data is ~0.8GB per hour of 720p30
+    
+    def __init__(self, input_file, bitrate_kbps, output_dir, segment_length=2, width=None, height=None,
+                 hwaccel='auto', parallel=1, fps=None, container='ts', live=False, twopass=False,
+                 single_file=False, keep_passlog=False):
         self.input_file = input_file
         self.bitrate_kbps = bitrate_kbps
         self.output_dir = output_dir
         self.segment_length = segment_length
         self.width = width
         self.height = height
-        self.temp_file = None
+        self.hwaccel = hwaccel
+        self.parallel = parallel
+        self.fps = fps
+        self.container = container
+        self.live = live
+        self.twopass = twopass
+        self.single_file = single_file
+        self.keep_passlog = keep_passlog
+        self.segment_ext = '.m4s' if container == 'fmp4' else '.ts'
+        self.video_encoder = None
+        self.hw_decode = False
+        self.concat_file = None
+        self.info_source = input_file
+        self._input_type = None
+        self._argv_templates = {}
+        self.output_fps = None
+        self.media_files = []
         self.temp_dir = None
         self.is_url = self.is_remote_url(input_file)
         
@@ -36,6 +166,12 @@ class WebRTCConverter:
         return path.startswith(('http://', 'https://'))
         
     def detect_input_type(self):
+        """Detect if input is MP4, M3U8, or other format, once per input"""
+        if self._input_type is None:
+            self._input_type = self._detect_input_type()
+        return self._input_type
+    
+    def _detect_input_type(self):
         """Detect if input is MP4, M3U8, or other format"""
         if self.is_url:
             # For URLs, determine type from extension or content
@@ -81,46 +217,174 @@ class WebRTCConverter:
         except Exception as e:
             raise RuntimeError(f"Cannot create output directory {self.output_dir}: {e}")
     
-    def get_video_info(self, video_file):
-        """Get video duration and other properties"""
+    def _quiet_argv(self, argv):
+        """Stop ffmpeg polling stdin for key commands and printing its banner"""
+        if argv[0] == 'ffmpeg':
+            return [argv[0], *self._FFMPEG_QUIET_ARGS, *argv[1:]]
+        return argv
+    
+    def _run(self, argv, **kwargs):
+        """subprocess.run for ffmpeg/ffprobe with stdin detached from the terminal"""
+        return subprocess.run(self._quiet_argv(argv), stdin=subprocess.DEVNULL, **kwargs)
+    
+    def _probe_ffmpeg(self, flag):
+        """List component names from `ffmpeg -encoders`/`-filters`, probed once per process"""
+        if flag not in WebRTCConverter._ffmpeg_components:
+            try:
+                result = self._run(['ffmpeg', flag], capture_output=True, text=True)
+                names = {line.split()[1] for line in result.stdout.split('\n') if len(line.split()) > 1}
+            except OSError:
+                names = set()
+            WebRTCConverter._ffmpeg_components[flag] = names
+        
+        return WebRTCConverter._ffmpeg_components[flag]
+    
+    def _encoder_works(self, encoder):
+        """Check a hardware encoder can actually open by encoding one frame, probed once per process"""
+        key = f'encode:{encoder}'
+        if key not in WebRTCConverter._ffmpeg_components:
+            # Distro builds list hardware encoders even when no GPU is present
+            works = False
+            if encoder in self._probe_ffmpeg('-encoders'):
+                test_cmd = ['ffmpeg']
+                if encoder == 'h264_vaapi':
+                    test_cmd.extend(['-vaapi_device', self.VAAPI_DEVICE])
+                test_cmd.extend(['-f', 'lavfi', '-i', 'color=black:s=256x256:r=30', '-frames:v', '1'])
+                if encoder == 'h264_vaapi':
+                    test_cmd.extend(['-vf', 'format=nv12,hwupload'])
+                elif encoder == 'h264_qsv':
+                    test_cmd.extend(['-vf', 'format=nv12'])
+                test_cmd.extend(['-c:v', encoder, '-f', 'null', '-'])
+                try:
+                    works = self._run(test_cmd, capture_output=True).returncode == 0
+                except OSError:
+                    pass
+            WebRTCConverter._ffmpeg_components[key] = works
+        
+        return WebRTCConverter._ffmpeg_components[key]
+    
+    def _detect_hw_encoder(self):
+        """Return the first hardware H.264 encoder that works on this machine, or None"""
+        for encoder in self.HW_ENCODERS.values():
+            if self._encoder_works(encoder):
+                return encoder
+        return None
+    
+    def _is_hw_init_failure(self, stderr):
+        """Whether FFmpeg failed setting up hardware decode/encode rather than on the input itself"""
+        stderr = stderr.lower()
+        return any(error in stderr for error in self._HW_INIT_ERRORS)
+    
+    def select_video_encoder(self):
+        """Pick the H.264 encoder according to the --hwaccel setting"""
+        if self.hwaccel == 'none':
+            return 'libx264'
+        
+        if self.hwaccel == 'auto':
+            return self._detect_hw_encoder() or 'libx264'
+        
+        encoder = self.HW_ENCODERS[self.hwaccel]
+        if self._encoder_works(encoder):
+            return encoder
+        
+        print(f"Warning: {encoder} not usable with this FFmpeg build/hardware, using libx264")
+        return 'libx264'
+    
+    def get_hwaccel_args(self, encoder):
+        """Get hardware decode arguments that keep frames in GPU memory"""
+        if encoder == 'h264_nvenc':
+            return ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda']
+        elif encoder == 'h264_vaapi':
+            return ['-hwaccel', 'vaapi', '-hwaccel_device', self.VAAPI_DEVICE,
+                    '-hwaccel_output_format', 'vaapi']
+        return []
+    
+    def get_scale_filter(self, encoder, hw_decode):
+        """Get the scale filter matching where decoded frames live"""
+        if self.width and self.height:
+            # Both width and height specified
+            size = f'{self.width}:{self.height}'
+        elif self.width:
+            # Only width specified, maintain aspect ratio
+            size = f'{self.width}:-2'
+        else:
+            # Only height specified, maintain aspect ratio
+            size = f'-2:{self.height}'
+        
+        if hw_decode and encoder == 'h264_nvenc':
+            if 'scale_npp' in self._probe_ffmpeg('-filters'):
+                return f'scale_npp={size}:interp_algo=lanczos'
+            return f'scale_cuda={size}:interp_algo=lanczos'
+        elif hw_decode and encoder == 'h264_vaapi':
+            return f'scale_vaapi={size}'
+        return f'scale={size}:flags=lanczos'
+    
+    def get_encoder_args(self, encoder):
+        """Get codec arguments for the given H.264 encoder"""
+        if encoder != 'libx264':
+            return self._ENCODER_ARGV_TEMPLATES[encoder]
+        
+        # Slice threads spread each frame across cores.
+        # Parallel chunk workers share the cores between them.
+        threads = max(1, (os.cpu_count() or 1) // self.parallel)
+        
+        if self.live:
+            return self._X264_ARGV_TEMPLATE + (
+                '-tune', 'zerolatency',    # Minimize latency
+                '-x264-params', f'sliced-threads=1:threads={threads}:sync-lookahead=0',
+            )
+        
+        # VOD output can afford lookahead; mb-tree spends bits where they are referenced
+        return self._X264_ARGV_TEMPLATE + (
+            '-x264-params', f'rc-lookahead=25:mbtree=1:sync-lookahead=0:sliced-threads=1:threads={threads}',
+        )
+    
+    def probe_json(self, probe_args):
+        """Run ffprobe with JSON output and return the parsed result"""
+        probe_cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json'] + probe_args
+        result = self._run(probe_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+        return json.loads(result.stdout)
+    
+    @functools.cached_property
+    def video_info(self):
+        """Video duration and other properties of info_source, probed once"""
         try:
-            probe_cmd = [
-                'ffprobe', '-v', 'quiet',
-                '-show_format', '-show_streams',
-                '-of', 'default=noprint_wrappers=1',
-                video_file
-            ]
-            result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
-            
-            duration = None
-            width = None
-            height = None
-            fps = None
+            data = self.probe_json(['-show_format', '-show_streams', self.info_source])
             
-            for line in result.stdout.split('\n'):
-                if line.startswith('duration='):
-                    duration = float(line.split('=')[1])
-                elif line.startswith('width='):
-                    width = int(line.split('=')[1])
-                elif line.startswith('height='):
-                    height = int(line.split('=')[1])
-                elif line.startswith('r_frame_rate='):
-                    fps_str = line.split('=')[1]
-                    if '/' in fps_str:
-                        num, den = fps_str.split('/')
-                        fps = float(num) / float(den) if float(den) != 0 else 30.0
-                    else:
-                        fps = float(fps_str) if fps_str else 30.0
+            streams = [s for s in data.get('streams', []) if s.get('codec_type') == 'video']
+            video_stream = streams[0] if streams else {}
+            
+            duration = data.get('format', {}).get('duration') or video_stream.get('duration')
+            
+            # avg_frame_rate holds up better than r_frame_rate on VFR and interlaced input
+            fps = None
+            frame_rate = None
+            for key in ('avg_frame_rate', 'r_frame_rate'):
+                fps_str = video_stream.get(key, '')
+                if '/' in fps_str:
+                    num, den = fps_str.split('/')
+                    fps = float(num) / float(den) if float(den) != 0 else None
+                elif fps_str:
+                    fps = float(fps_str)
+                if fps:
+                    # Keep the exact rational (30000/1001) for -r
+                    frame_rate = fps_str
+                    break
             
             return {
-                'duration': duration,
-                'width': width,
-                'height': height,
-                'fps': fps or 30.0  # Default to 30fps
+                'duration': float(duration) if duration else None,
+                'width': video_stream.get('width'),
+                'height': video_stream.get('height'),
+                'fps': fps or 30.0,  # Default to 30fps
+                'frame_rate': frame_rate  # None when the rate could not be probed
             }
         except Exception as e:
             print(f"Warning: Could not get video info: {e}")
-            return {'duration': None, 'width': None, 'height': None, 'fps': 30.0}
+            return {'duration': None, 'width': None, 'height': None, 'fps': 30.0, 'frame_rate': None}
+    
+    def get_video_info(self):
+        """Get video duration and other properties"""
+        return self.video_info
     
     def download_m3u8_and_segments(self):
         """Download M3U8 and all its segments to temporary directory"""
@@ -156,15 +420,22 @@ class WebRTCConverter:
             
             print(f"Found {len(segments)} segments to download...")
             
-            # Download segments
-            for i, (segment_url, local_path) in enumerate(zip(segments, local_segments)):
-                print(f"Downloading segment {i+1}/{len(segments)}...", end='\r')
-                try:
-                    with urllib.request.urlopen(segment_url) as response:
-                        with open(local_path, 'wb') as f:
-                            f.write(response.read())
-                except Exception as e:
-                    print(f"\nWarning: Failed to download segment {i+1}: {e}")
+            # Download segments concurrently so network waits overlap
+            def download_segment(segment_url, local_path):
+                with urllib.request.urlopen(segment_url) as response:
+                    with open(local_path, 'wb') as f:
+                        shutil.copyfileobj(response, f, 1 << 20)
+            
+            with ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS) as executor:
+                futures = [executor.submit(download_segment, segment_url, local_path)
+                           for segment_url, local_path in zip(segments, local_segments)]
+                
+                for i, future in enumerate(futures):
+                    print(f"Downloading segment {i+1}/{len(segments)}...", end='\r')
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"\nWarning: Failed to download segment {i+1}: {e}")
             
             print(f"\n✓ Downloaded {len(local_segments)} segments")
             
@@ -189,62 +460,44 @@ class WebRTCConverter:
     
     def parse_m3u8_segments(self, m3u8_file):
         """Parse M3U8 file and get segment list"""
-        segments = []
-        base_dir = Path(m3u8_file).parent
+        if os.path.getsize(m3u8_file) == 0:
+            return []
         
-        with open(m3u8_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    segment_path = base_dir / line
-                    segments.append(str(segment_path))
+        # Let the regex engine find URI lines instead of looping over lines in Python
+        with open(m3u8_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                lines = self._SEGMENT_LINE_RE.findall(mm)
+        
+        base_dir = os.fspath(Path(m3u8_file).parent) + os.sep
+        segments = []
+        for line in lines:
+            line = line.decode().strip()
+            if line and not line.startswith('#'):
+                segments.append(line if line.startswith(('/', 'http')) else base_dir + line)
         
         return segments
     
-    def concatenate_hls_segments(self, segments):
-        """Concatenate HLS segments into single file"""
-        if self.temp_dir:
-            temp_file = os.path.join(self.temp_dir, 'concatenated.ts')
-        else:
-            temp_file = os.path.join(self.output_dir, 'temp_concatenated.ts')
-        
-        self.temp_file = temp_file
+    def build_concat_input(self, segments):
+        """Write a concat list for HLS segments and return FFmpeg input arguments reading it"""
+        list_dir = self.temp_dir if self.temp_dir else self.output_dir
+        self.concat_file = os.path.join(list_dir, 'concat_list.txt')
         
-        # Create concat file
-        concat_file = os.path.join(os.path.dirname(temp_file), 'concat_list.txt')
-        with open(concat_file, 'w') as f:
+        # Paths in a concat list resolve relative to the list file
+        with open(self.concat_file, 'w') as f:
             for segment in segments:
                 if os.path.exists(segment):
-                    f.write(f"file '{segment}'\n")
+                    f.write(f"file '{os.path.abspath(segment)}'\n")
                 else:
                     print(f"Warning: Segment not found: {segment}")
         
-        # Concatenate
-        concat_cmd = [
-            'ffmpeg', '-y',
-            '-f', 'concat', '-safe', '0',
-            '-i', concat_file,
-            '-c', 'copy',
-            temp_file
-        ]
-        
-        print("Concatenating HLS segments...")
-        try:
-            subprocess.run(concat_cmd, capture_output=True, text=True, check=True)
-            print("✓ Segments concatenated successfully")
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Failed to concatenate segments: {e.stderr}")
-        finally:
-            if os.path.exists(concat_file):
-                os.remove(concat_file)
-        
-        return temp_file
+        print("✓ Segments will be read directly by the encoder")
+        return ['-f', 'concat', '-safe', '0', '-i', self.concat_file]
     
-    def convert_to_webrtc_hls(self, input_video):
+    def convert_to_webrtc_hls(self, input_args):
         """Convert video to WebRTC-compliant HLS"""
         
         # Get video info
-        video_info = self.get_video_info(input_video)
+        video_info = self.get_video_info()
         duration = video_info['duration']
         fps = video_info['fps']
         
@@ -260,42 +513,218 @@ class WebRTCConverter:
         else:
             print(f"Output video: {output_width}x{output_height} (original dimensions)")
         
+        if self.parallel > 1 and not self.fps and not video_info['frame_rate']:
+            # Chunk cut points assume CFR output, which needs a known frame rate
+            print("Warning: input frame rate unknown, --parallel disabled (use --fps to enable it)")
+            self.parallel = 1
+        
         # Calculate GOP size (keyframe every segment_length seconds)
-        gop_size = int(fps * self.segment_length)
+        self.output_fps = self.fps if self.fps else fps
+        gop_size = round(self.output_fps * self.segment_length)
         
         # Output files
         output_prefix = os.path.join(self.output_dir, 'index')
         m3u8_file = f"{output_prefix}.m3u8"
         
-        # FFmpeg command for WebRTC-optimized HLS
-        ffmpeg_cmd = [
-            'ffmpeg', '-y',
-            '-i', input_video,
+        self.video_encoder = self.select_video_encoder()
+        attempts = []
+        if self.get_hwaccel_args(self.video_encoder):
+            attempts.append((self.video_encoder, True))
+        attempts.append((self.video_encoder, False))
+        if self.video_encoder != 'libx264':
+            # Hardware may still be busy or reject these settings
+            attempts.append(('libx264', False))
+        
+        print(f"Converting to WebRTC-compliant HLS ({self.bitrate_kbps}kbps, {self.video_encoder})...")
+        print("This may take a few minutes...")
+        
+        for i, (encoder, hw_decode) in enumerate(attempts):
+            if i > 0:
+                # Hardware decode fails on some input codecs/pixel formats
+                decode = 'hardware' if hw_decode else 'software'
+                print(f"✗ Attempt failed, retrying with {encoder} and {decode} decode...")
+            self.video_encoder = encoder
+            self.hw_decode = hw_decode
+            
+            result = self.run_encode(input_args, encoder, gop_size, output_prefix, hw_decode, duration)
+            
+            if result.returncode == 0:
+                print("✓ Conversion successful!")
+                return m3u8_file
+            
+            # Only hardware setup failures are worth another attempt; input errors would just repeat
+            uses_hardware = encoder != 'libx264' or hw_decode
+            if not (uses_hardware and self._is_hw_init_failure(result.stderr)):
+                break
+        
+        print("✗ Conversion failed!")
+        print("Error output:")
+        print(result.stderr)
+        raise RuntimeError("FFmpeg conversion failed")
+    
+    def get_chunk_ranges(self, duration, gop_size):
+        """Split the input into per-worker (start, end) ranges on segment boundaries"""
+        # Keyframes come every gop_size frames, which is not exactly segment_length
+        # at fractional frame rates (60 frames at 29.97fps is 2.002s)
+        gop_duration = gop_size / self.output_fps
+        total_segments = math.ceil(duration / gop_duration)
+        workers = min(self.parallel, total_segments)
+        chunk_length = math.ceil(total_segments / workers) * gop_duration
+        
+        ranges = []
+        k = 0
+        while k * chunk_length < duration:
+            start = round(k * chunk_length, 6)
+            end = round((k + 1) * chunk_length, 6)
+            # Last chunk runs to the end of the input
+            ranges.append((start, end if end < duration else None))
+            k += 1
+        return ranges
+    
+    def run_ffmpeg(self, ffmpeg_cmd):
+        """Run FFmpeg keeping only the tail of stderr instead of buffering all of it"""
+        ffmpeg_cmd = self._quiet_argv(ffmpeg_cmd)
+        process = subprocess.Popen(ffmpeg_cmd,
+                                   stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE,
+                                   bufsize=1 << 20,
+                                   text=True,
+                                   errors='replace')
+        
+        # Universal newlines split the \r-terminated progress lines too.
+        # stderr is the only pipe, so draining it here cannot deadlock.
+        stderr_tail = collections.deque(maxlen=200)
+        for line in process.stderr:
+            stderr_tail.append(line)
+        process.wait()
+        
+        return subprocess.CompletedProcess(ffmpeg_cmd, process.returncode, stderr=''.join(stderr_tail))
+    
+    def run_encode(self, input_args, encoder, gop_size, output_prefix, hw_decode, duration):
+        """Run the encode, splitting it across parallel workers when requested"""
+        if self.twopass and self.keep_passlog and encoder == 'libx264':
+            # Prune once up front so concurrent chunks never delete each other's stats
+            self.prune_passlog_cache()
+        
+        if self.parallel <= 1 or not duration:
+            return self.encode_range(input_args, encoder, gop_size, output_prefix, hw_decode)
+        
+        ranges = self.get_chunk_ranges(duration, gop_size)
+        chunk_prefixes = [f'{output_prefix}_chunk{k}' for k in range(len(ranges))]
+        print(f"Encoding {len(ranges)} chunks in parallel...")
+        
+        def encode_chunk(k):
+            start, end = ranges[k]
+            return self.encode_range(input_args, encoder, gop_size, chunk_prefixes[k], hw_decode, start, end)
+        
+        # Workers only wait on their ffmpeg child, so threads are enough
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            results = list(executor.map(encode_chunk, range(len(ranges))))
+        
+        for result in results:
+            if result.returncode != 0:
+                return result
+        
+        self.stitch_playlists(chunk_prefixes, output_prefix)
+        return results[-1]
+    
+    def stitch_playlists(self, chunk_prefixes, output_prefix):
+        """Merge per-chunk HLS playlists into one, renumbering segments sequentially"""
+        output_dir = os.path.dirname(output_prefix)
+        output_name = Path(output_prefix).name
+        header = []
+        body = []
+        segment_count = 0
+        target_duration = 0
+        
+        for k, chunk_prefix in enumerate(chunk_prefixes):
+            chunk_m3u8 = f'{chunk_prefix}.m3u8'
+            chunk_dir = os.path.dirname(chunk_m3u8)
+            in_header = True
+            
+            with open(chunk_m3u8, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line == '#EXT-X-ENDLIST':
+                        continue
+                    
+                    if line.startswith('#EXT-X-TARGETDURATION:'):
+                        target_duration = max(target_duration, int(line.split(':', 1)[1]))
+                    
+                    if line.startswith('#EXT-X-MAP:'):
+                        # Each fMP4 chunk carries its own init segment
+                        init_file = line.split('URI="', 1)[1].split('"', 1)[0]
+                        init_name = f'{output_name}_init.mp4' if k == 0 else f'{output_name}_init_{k}.mp4'
+                        os.replace(os.path.join(chunk_dir, init_file), os.path.join(output_dir, init_name))
+                        body.append(f'#EXT-X-MAP:URI="{init_name}"')
+                        in_header = False
+                    elif line.startswith('#EXTINF:'):
+                        body.append(line)
+                        in_header = False
+                    elif not line.startswith('#'):
+                        segment_name = f'{output_name}_{segment_count:03d}{self.segment_ext}'
+                        os.replace(os.path.join(chunk_dir, line), os.path.join(output_dir, segment_name))
+                        body.append(segment_name)
+                        segment_count += 1
+                    elif k == 0 and in_header:
+                        # Shared header comes from the first chunk
+                        header.append(line)
             
-            # Video codec settings - WebRTC optimized
-            '-c:v', 'libx264',
-            '-profile:v', 'baseline',      # Maximum compatibility
-            '-level', '3.1',               # Widely supported level
-            '-preset', 'fast',             # Good speed/quality balance
-            '-tune', 'zerolatency',        # Minimize latency
-        ]
+            os.remove(chunk_m3u8)
+        
+        with open(f'{output_prefix}.m3u8', 'w') as f:
+            for line in header:
+                if line.startswith('#EXT-X-TARGETDURATION:'):
+                    line = f'#EXT-X-TARGETDURATION:{target_duration}'
+                f.write(f"{line}\n")
+            for line in body:
+                f.write(f"{line}\n")
+            f.write("#EXT-X-ENDLIST\n")
+    
+    def get_argv_template(self, encoder, hw_decode, gop_size):
+        """Get the (pre-input, codec, muxer, segment extension) arguments shared by every run of one encode"""
+        key = (encoder, hw_decode, gop_size, self.output_fps)
+        if key in self._argv_templates:
+            return self._argv_templates[key]
+        
+        pre_input = []
+        if hw_decode:
+            # Decode on the GPU and keep frames there until the encoder
+            pre_input.extend(self.get_hwaccel_args(encoder))
+        elif encoder == 'h264_vaapi':
+            pre_input.extend(['-vaapi_device', self.VAAPI_DEVICE])
+        
+        # Video codec settings - WebRTC optimized
+        post_input = list(self.get_encoder_args(encoder))
+        
+        if not hw_decode:
+            # Output option, so it also applies to any scaler FFmpeg inserts automatically
+            post_input.extend(['-sws_flags', 'lanczos+accurate_rnd'])
         
         # Add scaling filter if custom dimensions are specified
+        vf_parts = []
+        if self.fps:
+            # Drop frames before scaling so discarded frames are never scaled
+            vf_parts.append(f'fps={self.fps:g}')
+        
         if self.width or self.height:
-            if self.width and self.height:
-                # Both width and height specified
-                scale_filter = f'scale={self.width}:{self.height}'
-            elif self.width:
-                # Only width specified, maintain aspect ratio
-                scale_filter = f'scale={self.width}:-2'
-            else:
-                # Only height specified, maintain aspect ratio
-                scale_filter = f'scale=-2:{self.height}'
-            
-            ffmpeg_cmd.extend(['-vf', scale_filter])
+            vf_parts.append(self.get_scale_filter(encoder, hw_decode))
+        
+        if not hw_decode and (self.width or self.height or encoder == 'h264_vaapi'):
+            # Convert pixel format in the same filter chain as the resize
+            pix_fmt = 'nv12' if encoder in ('h264_vaapi', 'h264_qsv') else 'yuv420p'
+            vf_parts.append(f'format={pix_fmt}')
+        
+        if encoder == 'h264_vaapi' and not hw_decode:
+            # VAAPI encodes from GPU surfaces
+            vf_parts.append('hwupload')
+        
+        if vf_parts:
+            post_input.extend(['-vf', ','.join(vf_parts)])
         
         # Continue with encoding settings
-        ffmpeg_cmd.extend([
+        post_input.extend([
             # Bitrate control (constant for smooth playback)
             '-b:v', f'{self.bitrate_kbps}k',
             '-minrate', f'{self.bitrate_kbps}k',
@@ -306,44 +735,163 @@ class WebRTCConverter:
             '-g', str(gop_size),           # Keyframe every segment
             '-keyint_min', str(gop_size),  # Minimum keyframe interval
             '-sc_threshold', '0',          # Disable scene cut detection
-            '-force_key_frames', f'expr:gte(t,n_forced*{self.segment_length})',
-            
-            # WebRTC compatibility settings
-            '-bf', '0',                    # No B-frames
-            '-refs', '1',                  # Single reference frame
-            '-coder', '0',                 # CAVLC (not CABAC)
-            '-fast-pskip', '1',            # Fast skip decisions
-            
-            # Disable audio output
-            '-an',
-            
-            # HLS segmentation
-            '-f', 'hls',
-            '-hls_time', str(self.segment_length),
-            '-hls_playlist_type', 'vod',
-            '-hls_segment_filename', f'{output_prefix}_%03d.ts',
-            '-hls_flags', 'independent_segments',
-            
-            # Output M3U8
-            m3u8_file
         ])
         
-        print(f"Converting to WebRTC-compliant HLS ({self.bitrate_kbps}kbps)...")
-        print("This may take a few minutes...")
+        frame_rate = self.video_info['frame_rate']
+        if not self.fps and frame_rate:
+            # Constant frame rate so a fixed GOP lands exactly on segment boundaries,
+            # even for VFR input (--fps already makes the output CFR through the fps filter)
+            post_input.extend(['-fps_mode', 'cfr', '-r', frame_rate])
+        elif not self.fps:
+            # GOP sizing used a guessed rate, so place keyframes by timestamp instead
+            post_input.extend(['-force_key_frames', f'expr:gte(t,n_forced*{self.segment_length})'])
+        post_input.extend(self._OUTPUT_ARGV_TEMPLATE)
         
-        try:
-            result = subprocess.run(ffmpeg_cmd, 
-                                  capture_output=True, 
-                                  text=True, 
-                                  check=True)
-            print("✓ Conversion successful!")
-            return m3u8_file
-            
-        except subprocess.CalledProcessError as e:
-            print("✗ Conversion failed!")
-            print("Error output:")
-            print(e.stderr)
-            raise RuntimeError("FFmpeg conversion failed")
+        muxer = list(self._HLS_ARGV_TEMPLATE)
+        muxer.extend(['-hls_time', str(self.segment_length)])
+        muxer.extend(['-hls_flags', 'independent_segments+single_file' if self.single_file else 'independent_segments'])
+        if self.container == 'fmp4':
+            muxer.extend(['-hls_segment_type', 'fmp4'])
+        
+        # single_file writes every segment into one file, addressed by byte range
+        segment_suffix = self.segment_ext if self.single_file else f'_%03d{self.segment_ext}'
+        
+        template = (tuple(pre_input), tuple(post_input), tuple(muxer), segment_suffix)
+        self._argv_templates[key] = template
+        return template
+    
+    @classmethod
+    def _render_argv(cls, template, input_args, output_prefix, start=None, end=None, pass_args=()):
+        """Fill an argv template with the input, output and optional chunk range"""
+        pre_input, post_input, muxer, segment_suffix = template
+        
+        # Input seeking for parallel chunks; timestamps restart at 0 on a segment boundary
+        seek = ()
+        if start:
+            seek += ('-ss', str(start))
+        if end is not None:
+            seek += ('-to', str(end))
+        
+        argv = cls._FFMPEG_ARGV_PREFIX + pre_input + seek + tuple(input_args) + post_input + tuple(pass_args)
+        if output_prefix is None:
+            # First pass only gathers rate-control stats
+            return argv + ('-f', 'null', os.devnull)
+        
+        # Keep timestamps continuous across stitched chunks
+        ts_offset = ('-output_ts_offset', str(start)) if start else ()
+        
+        # fMP4 init segment is written next to the playlist
+        init = ('-hls_fmp4_init_filename', f'{Path(output_prefix).name}_init.mp4') if segment_suffix.endswith('.m4s') else ()
+        
+        return (argv + muxer + ts_offset + init +
+                ('-hls_segment_filename', f'{output_prefix}{segment_suffix}', f'{output_prefix}.m3u8'))
+    
+    def build_ffmpeg_cmd(self, input_args, encoder, gop_size, output_prefix, hw_decode=False,
+                         start=None, end=None, pass_args=()):
+        """Build the FFmpeg command for WebRTC-optimized HLS, or a null-output first pass if output_prefix is None"""
+        template = self.get_argv_template(encoder, hw_decode, gop_size)
+        return list(self._render_argv(template, input_args, output_prefix, start, end, pass_args))
+    
+    @functools.cached_property
+    def media_fingerprint(self):
+        """Digest identifying the input media content, used to key cached pass logs"""
+        digest = hashlib.blake2b(digest_size=16)
+        
+        if self.media_files:
+            # Head of the first file plus size/mtime of every file (HLS segments or the video)
+            with open(self.media_files[0], 'rb') as f:
+                digest.update(f.read(1 << 20))
+            for media_file in self.media_files:
+                stat = os.stat(media_file)
+                digest.update(f'{media_file}:{stat.st_size}:{stat.st_mtime_ns}\n'.encode())
+        else:
+            # Remote video: no local copy, so rely on the server's validators
+            digest.update(self.input_file.encode())
+            try:
+                req = urllib.request.Request(self.input_file, method='HEAD')
+                with urllib.request.urlopen(req) as response:
+                    for header in ('content-length', 'etag', 'last-modified'):
+                        digest.update(f"{header}:{response.headers.get(header, '')}\n".encode())
+            except Exception:
+                pass
+        
+        return digest.hexdigest()
+    
+    def get_passlog_path(self, encoder, hw_decode, gop_size, start=None, end=None):
+        """Passlog prefix keyed by the input media and every setting that shapes the first pass"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.media_fingerprint.encode())
+        
+        template = self.get_argv_template(encoder, hw_decode, gop_size)
+        digest.update(repr((template, start, end)).encode())
+        
+        os.makedirs(self.PASSLOG_DIR, exist_ok=True)
+        return os.path.join(self.PASSLOG_DIR, digest.hexdigest())
+    
+    def remove_passlog(self, passlog):
+        """Delete the stats (and mb-tree data) libx264 wrote for a passlog prefix"""
+        for suffix in ('-0.log', '-0.log.mbtree'):
+            if os.path.exists(passlog + suffix):
+                os.remove(passlog + suffix)
+    
+    def prune_passlog_cache(self):
+        """Delete the least recently used passlogs until the cache fits PASSLOG_CACHE_BYTES"""
+        if not os.path.isdir(self.PASSLOG_DIR):
+            return
+        
+        entries = []
+        with os.scandir(self.PASSLOG_DIR) as it:
+            for entry in it:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.PASSLOG_CACHE_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+    
+    def encode_range(self, input_args, encoder, gop_size, output_prefix, hw_decode, start=None, end=None):
+        """Encode the input (or one chunk of it), with a cached first pass when two-pass is on"""
+        if not (self.twopass and encoder == 'libx264'):
+            ffmpeg_cmd = self.build_ffmpeg_cmd(input_args, encoder, gop_size, output_prefix, hw_decode, start, end)
+            return self.run_ffmpeg(ffmpeg_cmd)
+        
+        passlog = self.get_passlog_path(encoder, hw_decode, gop_size, start, end)
+        first_pass = self.build_ffmpeg_cmd(input_args, encoder, gop_size, None, hw_decode, start, end,
+                                           ('-pass', '1', '-passlogfile', passlog))
+        second_pass = self.build_ffmpeg_cmd(input_args, encoder, gop_size, output_prefix, hw_decode, start, end,
+                                            ('-pass', '2', '-passlogfile', passlog))
+        
+        # FFmpeg appends the stream index to the passlog prefix
+        if os.path.exists(f'{passlog}-0.log'):
+            print("✓ Reusing cached first-pass stats")
+            # Mark as recently used so pruning removes older entries first
+            for suffix in ('-0.log', '-0.log.mbtree'):
+                if os.path.exists(passlog + suffix):
+                    os.utime(passlog + suffix)
+            result = self.run_ffmpeg(second_pass)
+            if result.returncode == 0:
+                return result
+            
+            # Stats may not match the input any more; redo the first pass once
+            print("✗ Second pass failed with cached stats, rerunning first pass...")
+            self.remove_passlog(passlog)
+        
+        result = self.run_ffmpeg(first_pass)
+        if result.returncode != 0:
+            self.remove_passlog(passlog)
+            return result
+        
+        result = self.run_ffmpeg(second_pass)
+        if result.returncode != 0 or not self.keep_passlog:
+            self.remove_passlog(passlog)
+        return result
     
     def analyze_output(self, m3u8_file):
         """Analyze the generated HLS output"""
@@ -362,80 +910,145 @@ class WebRTCConverter:
         print(m3u8_content)
         print("-" * 50)
         
-        # Parse segments
+        # Parse segments, along with the fMP4 init segment each one needs
+        # and its (length, offset) inside a single-file output
         segments = []
+        init_segments = []
+        byte_ranges = []
+        durations = []
+        init_segment = None
+        byte_range = None
+        next_offset = 0
         for line in m3u8_content.split('\n'):
             line = line.strip()
-            if line and not line.startswith('#'):
+            if line.startswith('#EXTINF:'):
+                durations.append(float(line[len('#EXTINF:'):].split(',', 1)[0]))
+            elif line.startswith('#EXT-X-MAP:'):
+                init_file = line.split('URI="', 1)[1].split('"', 1)[0]
+                init_segment = os.path.join(self.output_dir, init_file)
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                length, _, offset = line[len('#EXT-X-BYTERANGE:'):].partition('@')
+                byte_range = (int(length), int(offset) if offset else next_offset)
+                next_offset = sum(byte_range)
+            elif line and not line.startswith('#'):
                 segment_path = os.path.join(self.output_dir, line)
                 segments.append(segment_path)
+                init_segments.append(init_segment)
+                byte_ranges.append(byte_range)
+                byte_range = None
         
         print(f"\nSegment Analysis ({len(segments)} segments):")
-        total_size = 0
+        segment_sizes = self._scan_segment_sizes()
         
-        for i, segment in enumerate(segments):
-            if os.path.exists(segment):
-                size_kb = os.path.getsize(segment) / 1024
-                total_size += size_kb
-                
-                # Check keyframe start
-                keyframe_info = self.check_keyframe_start(segment)
-                
-                print(f"  {i+1:2d}. {Path(segment).name} - "
+        def probe(segment, init_segment, byte_range):
+            size = segment_sizes.get(Path(segment).name)
+            if size is not None and byte_range:
+                size = byte_range[0]
+            return self._probe_segment(segment, size, init_segment, byte_range)
+        
+        # Probes are independent ffprobe processes, so run them concurrently
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(executor.map(probe, segments, init_segments, byte_ranges))
+        
+        for i, (name, size_kb, keyframe_info) in enumerate(results):
+            if size_kb is not None:
+                print(f"  {i+1:2d}. {name} - "
                       f"{size_kb:.1f} KB {keyframe_info}")
             else:
-                print(f"  {i+1:2d}. {Path(segment).name} - MISSING")
+                print(f"  {i+1:2d}. {name} - MISSING")
         
+        total_size = self._compute_total_kb(results)
         print(f"\nTotal size: {total_size:.1f} KB ({total_size/1024:.2f} MB)")
         
+        self.check_segment_durations(durations)
+        
         # Codec verification
         if segments:
-            self.verify_codec_settings(segments[0])
+            self.verify_codec_settings(segments[0], init_segments[0], byte_ranges[0])
+    
+    def _scan_segment_sizes(self):
+        """Map segment file name to size with one directory listing"""
+        return {entry.name: entry.stat().st_size
+                for entry in os.scandir(self.output_dir) if entry.name.endswith(self.segment_ext)}
+    
+    def _compute_total_kb(self, results):
+        """Total size of the segments the playlist references, in KB"""
+        # Summed from the playlist, not the directory, so stale files from earlier runs don't count
+        return sum(size_kb for _, size_kb, _ in results if size_kb is not None)
+    
+    def check_segment_durations(self, durations, tolerance=0.04):
+        """Check every segment but the last is segment_length long, within tolerance seconds"""
+        off_target = [(i, d) for i, d in enumerate(durations[:-1])
+                      if abs(d - self.segment_length) > tolerance]
+        
+        if off_target:
+            print(f"✗ {len(off_target)} segment(s) off the {self.segment_length}s target:")
+            for i, duration in off_target:
+                print(f"  {i+1:2d}. {duration:.3f}s")
+        else:
+            print(f"✓ Segment durations within {tolerance * 1000:.0f}ms of {self.segment_length}s")
+    
+    def _probe_segment(self, segment, size, init_segment=None, byte_range=None):
+        """Get (name, size in KB, keyframe info) for one segment, size None if missing"""
+        name = Path(segment).name
+        if byte_range:
+            name = f"{name} @{byte_range[1]}"
+        if size is None:
+            return name, None, None
+        
+        # Check keyframe start
+        probe_input = self._probe_input(segment, init_segment, byte_range)
+        return name, size / 1024, self.check_keyframe_start(probe_input)
+    
+    def _probe_input(self, segment, init_segment=None, byte_range=None):
+        """fMP4 media segments can only be probed with their init segment in front"""
+        if byte_range:
+            length, offset = byte_range
+            return f'subfile,,start,{offset},end,{offset + length},,:{segment}'
+        if init_segment:
+            return f'concat:{init_segment}|{segment}'
+        return segment
     
     def check_keyframe_start(self, segment_file):
         """Check if segment starts with keyframe"""
         try:
-            probe_cmd = [
-                'ffprobe', '-v', 'quiet',
+            data = self.probe_json([
                 '-select_streams', 'v:0',
                 '-show_frames',
                 '-show_entries', 'frame=key_frame',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
                 '-read_intervals', '%+#1',
                 segment_file
-            ]
-            result = subprocess.run(probe_cmd, capture_output=True, text=True)
+            ])
+            frames = data.get('frames', [])
             
-            if result.returncode == 0 and result.stdout.strip() == '1':
+            if frames and frames[0].get('key_frame') == 1:
                 return "✓ Keyframe"
             else:
                 return "✗ No keyframe"
-        except:
+        except subprocess.CalledProcessError:
+            return "✗ No keyframe"
+        except Exception:
             return "? Unknown"
     
-    def verify_codec_settings(self, sample_segment):
+    def verify_codec_settings(self, sample_segment, init_segment=None, byte_range=None):
         """Verify codec settings of output"""
         try:
-            probe_cmd = [
-                'ffprobe', '-v', 'quiet',
-                '-show_streams', '-select_streams', 'v:0',
-                sample_segment
-            ]
-            result = subprocess.run(probe_cmd, capture_output=True, text=True)
+            data = self.probe_json(['-show_streams', '-select_streams', 'v:0',
+                                    self._probe_input(sample_segment, init_segment, byte_range)])
+            stream = data['streams'][0]
             
             print(f"\nCodec Verification (sample: {Path(sample_segment).name}):")
-            for line in result.stdout.split('\n'):
-                if any(prop in line for prop in ['codec_name=', 'profile=', 'level=', 'bit_rate=', 'width=', 'height=']):
-                    key, value = line.split('=', 1)
-                    print(f"  {key}: {value}")
+            for key in ['codec_name', 'profile', 'level', 'bit_rate', 'width', 'height']:
+                if key in stream:
+                    print(f"  {key}: {stream[key]}")
                     
         except Exception as e:
             print(f"Could not verify codec: {e}")
     
     def cleanup(self):
         """Clean up temporary files"""
-        if self.temp_file and os.path.exists(self.temp_file):
-            os.remove(self.temp_file)
+        if self.concat_file and os.path.exists(self.concat_file):
+            os.remove(self.concat_file)
         
         if self.temp_dir and os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
@@ -450,6 +1063,12 @@ class WebRTCConverter:
             print(f"Segment length: {self.segment_length}s")
             if self.width or self.height:
                 print(f"Custom dimensions: {self.width or 'auto'}x{self.height or 'auto'}")
+            if self.fps:
+                print(f"Frame rate: {self.fps:g}fps")
+            print(f"Hardware acceleration: {self.hwaccel}")
+            print(f"Segment container: {self.container}")
+            if self.parallel > 1:
+                print(f"Parallel workers: {self.parallel}")
             
             if self.is_url:
                 print("Input type: Remote URL")
@@ -466,19 +1085,24 @@ class WebRTCConverter:
                 if self.is_url:
                     # Download M3U8 and segments
                     local_m3u8 = self.download_m3u8_and_segments()
-                    segments = self.parse_m3u8_segments(local_m3u8)
                 else:
                     # Parse local M3U8
-                    segments = self.parse_m3u8_segments(self.input_file)
+                    local_m3u8 = self.input_file
                 
+                segments = self.parse_m3u8_segments(local_m3u8)
                 print(f"Found {len(segments)} segments in M3U8")
-                video_file = self.concatenate_hls_segments(segments)
+                
+                # Encode straight from the segments; the playlist gives total duration
+                input_args = self.build_concat_input(segments)
+                self.info_source = local_m3u8
+                self.media_files = [segment for segment in segments if os.path.exists(segment)]
             else:
                 # Direct video file (local or URL)
-                video_file = self.input_file
+                input_args = ['-i', self.input_file]
+                self.media_files = [] if self.is_url else [self.input_file]
             
             # Convert to WebRTC-compliant HLS
-            output_m3u8 = self.convert_to_webrtc_hls(video_file)
+            output_m3u8 = self.convert_to_webrtc_hls(input_args)
             
             # Analyze output
             self.analyze_output(output_m3u8)
@@ -487,14 +1111,32 @@ class WebRTCConverter:
             print(f"WebRTC-compliant HLS created in: {self.output_dir}")
             print(f"Main playlist: {Path(output_m3u8).name}")
             print("\nOptimizations applied:")
+            if self.video_encoder != 'libx264':
+                print(f"✓ Hardware encoder: {self.video_encoder}")
+            if self.hw_decode:
+                print("✓ Hardware decode and scaling (frames stay in GPU memory)")
+            if self.parallel > 1:
+                print(f"✓ Parallel split-and-stitch encoding ({self.parallel} workers)")
             print("✓ Baseline profile (maximum compatibility)")
             print(f"✓ Constant {self.bitrate_kbps}kbps bitrate")
             print("✓ Keyframes every 2 seconds")
             print("✓ No B-frames (P-frames only)")
             print("✓ Single reference frame")
             print("✓ Video-only output (no audio)")
+            if self.container == 'fmp4':
+                print("✓ Fragmented MP4 segments (lower overhead than MPEG-TS)")
+            if self.single_file:
+                print("✓ Single media file with byte-range segments")
+            if self.video_encoder == 'libx264':
+                print("✓ Multi-threaded libx264 (slice threading)")
+                if not self.live:
+                    print("✓ Lookahead with mb-tree rate control (VOD)")
+                if self.twopass:
+                    print("✓ Two-pass rate control" + (" (first-pass stats cached)" if self.keep_passlog else ""))
             if self.width or self.height:
                 print(f"✓ Custom resolution: {self.width or 'auto'}x{self.height or 'auto'}")
+            if self.fps:
+                print(f"✓ Frame rate reduced to {self.fps:g}fps before scaling")
             
             return output_m3u8
             
@@ -517,6 +1159,12 @@ Examples:
   
   # With custom dimensions
   python3 webrtc_converter.py video.mp4 --bitrate 800 --width 1920 --output ./output
+  
+  # Force software encoding
+  python3 webrtc_converter.py video.mp4 --bitrate 800 --hwaccel none --output ./output
+  
+  # Split a long video across 8 parallel encoders
+  python3 webrtc_converter.py video.mp4 --bitrate 800 --parallel 8 --output ./output
         """
     )
     
@@ -531,6 +1179,22 @@ Examples:
                        help='Output width in pixels (optional, maintains aspect ratio if height not specified)')
     parser.add_argument('--height', type=int,
                        help='Output height in pixels (optional, maintains aspect ratio if width not specified)')
+    parser.add_argument('--fps', type=float,
+                       help='Output frame rate (optional, keeps the input frame rate if not specified)')
+    parser.add_argument('--hwaccel', choices=['auto', 'none', 'nvenc', 'amf', 'vaapi', 'qsv'], default='auto',
+                       help='Hardware H.264 encoder to use (default: auto, falls back to libx264)')
+    parser.add_argument('--container', choices=['ts', 'fmp4'], default='ts',
+                       help='Segment container: MPEG-TS or fragmented MP4 (default: ts)')
+    parser.add_argument('--single-file', action='store_true',
+                       help='Write all segments into one .ts file addressed by #EXT-X-BYTERANGE')
+    parser.add_argument('--live', action='store_true',
+                       help='Tune libx264 for zero latency instead of VOD compression efficiency')
+    parser.add_argument('--twopass', action='store_true',
+                       help='Two-pass libx264 encode for better bit allocation at the same bitrate')
+    parser.add_argument('--keep-passlog', action='store_true',
+                       help='With --twopass, cache first-pass stats in ~/.cache/webrtc_converter (up to 4GB)')
+    parser.add_argument('--parallel', type=int, default=1,
+                       help='Encode N time ranges in parallel and stitch the segments (default: 1)')
     
     args = parser.parse_args()
     
@@ -551,6 +1215,38 @@ Examples:
         print("Error: Height must be positive")
         return 1
     
+    if args.fps is not None and args.fps <= 0:
+        print("Error: Frame rate must be positive")
+        return 1
+    
+    if args.parallel < 1:
+        print("Error: Parallel workers must be at least 1")
+        return 1
+    
+    if args.single_file and args.container != 'ts':
+        print("Error: --single-file is only supported with --container ts")
+        return 1
+    
+    if args.single_file and args.parallel > 1:
+        print("Error: --single-file cannot be combined with --parallel")
+        return 1
+    
+    if args.keep_passlog and not args.twopass:
+        print("Error: --keep-passlog requires --twopass")
+        return 1
+    
+    # The bundled sender reads each playlist entry as a whole MPEG-TS file,
+    # ignoring #EXT-X-MAP and #EXT-X-BYTERANGE
+    sender_incompatible = None
+    if args.container == 'fmp4':
+        sender_incompatible = '--container fmp4'
+    elif args.single_file:
+        sender_incompatible = '--single-file'
+    
+    if sender_incompatible:
+        print(f"Warning: {sender_incompatible} output is not supported by the bundled "
+              "sample_send_h264_pcm sender, which reads each playlist entry as a whole MPEG-TS file")
+    
     try:
         converter = WebRTCConverter(
             input_file=args.input,
@@ -558,13 +1254,24 @@ Examples:
             output_dir=args.output,
             segment_length=args.segment_length,
             width=args.width,
-            height=args.height
+            height=args.height,
+            hwaccel=args.hwaccel,
+            parallel=args.parallel,
+            fps=args.fps,
+            container=args.container,
+            live=args.live,
+            twopass=args.twopass,
+            single_file=args.single_file,
+            keep_passlog=args.keep_passlog
         )
         
         output_m3u8 = converter.convert()
         
-        print(f"\nTo test the output:")
-        print(f"./out/sample_send_h264_pcm --token YOUR_TOKEN --channelId CHANNEL --videoFile {output_m3u8}")
+        if sender_incompatible:
+            print(f"\nNote: {sender_incompatible} output can't be played by sample_send_h264_pcm")
+        else:
+            print(f"\nTo test the output:")
+            print(f"./out/sample_send_h264_pcm --token YOUR_TOKEN --channelId CHANNEL --videoFile {output_m3u8}")
         
         return 0
         